@@ -1,38 +1,39 @@
 import csv
-import xml.etree.ElementTree as ET
 import argparse
+from collections import namedtuple
+from operator import attrgetter
+
+from xml.sax.saxutils import escape
+
+# The JFF layout is fixed, so the document is emitted from templates instead of building a DOM.
+XML_HEADER = "<?xml version='1.0' encoding='utf-8'?>\n<structure><type>fa</type><automaton>"
+XML_FOOTER = "</automaton></structure>"
+STATE_FMT = '<state id="{id}" name="q{id}"><x>{x}</x><y>100.0</y>{marks}</state>'
+TRANS_FMT = "<transition><from>{frm}</from><to>{to}</to>{read}</transition>"
+ATTR_ENTITIES = {'"': "&quot;"}
+
+# One row of the input CSV
+Transition = namedtuple("Transition", "frm read to")
 
 def create_jff(states, transitions, initial_state, final_states):
-    # Create the root element and add type and automaton subelements.
-    root = ET.Element("structure")
-    type_elem = ET.SubElement(root, "type")
-    type_elem.text = "fa"
-    automaton = ET.SubElement(root, "automaton")
-    
     # Create state elements.
     # For a simple layout, we assign x coordinate = id * 100.0, and y fixed to 100.0
-    for state in sorted(states, key=lambda s: int(s)):
-        state_elem = ET.SubElement(automaton, "state", id=state, name=f"q{state}")
-        # Default positions
-        ET.SubElement(state_elem, "x").text = str(float(state)*100.0)
-        ET.SubElement(state_elem, "y").text = "100.0"
-        # Mark initial if this is the chosen initial state
-        if state == initial_state:
-            ET.SubElement(state_elem, "initial")
-        # Mark as final if in final_states list
-        if state in final_states:
-            ET.SubElement(state_elem, "final")
+    # Each state id is parsed once and both the numeric and string forms are reused.
+    state_parts = []
+    for int_id, state in sorted((int(s), s) for s in states):
+        # Mark initial if this is the chosen initial state, and final if in final_states list
+        marks = ("<initial />" if state == initial_state else "") + ("<final />" if state in final_states else "")
+        state_parts.append(STATE_FMT.format(id=escape(state, ATTR_ENTITIES), x=f"{int_id*100.0}", marks=marks))
     
     # Create transition elements.
-    for t in transitions:
-        trans_elem = ET.SubElement(automaton, "transition")
-        ET.SubElement(trans_elem, "from").text = t["from"]
-        ET.SubElement(trans_elem, "to").text = t["to"]
-        # If read is empty string, JFLAP usually expects an empty tag
-        read_text = t["read"].strip()
-        ET.SubElement(trans_elem, "read").text = read_text if read_text != "" else ""
+    # If read is empty string, JFLAP usually expects an empty tag (already stripped in main)
+    trans_parts = [
+        TRANS_FMT.format(frm=escape(frm), to=escape(to),
+                         read=f"<read>{escape(read_text)}</read>" if read_text else "<read />")
+        for frm, read_text, to in transitions
+    ]
     
-    return root
+    return XML_HEADER + "".join(state_parts) + "".join(trans_parts) + XML_FOOTER
 
 def main():
     parser = argparse.ArgumentParser(description="Convert CSV with transitions into a JFLAP .jff file.")
@@ -50,9 +51,11 @@ def main():
             frm = row["From"].strip()
             read_val = row["Input"].strip()
             to = row["To"].strip()
-            transitions.append({"from": frm, "read": read_val, "to": to})
-            states.add(frm)
-            states.add(to)
+            transitions.append(Transition(frm, read_val, to))
+    
+    # Collect the states with C-level set merges instead of per-row adds.
+    states.update(map(attrgetter("frm"), transitions))
+    states.update(map(attrgetter("to"), transitions))
     
     # For demonstration, set initial state as the one with smallest numeric id and
     # final state as the one with largest numeric id.
@@ -60,11 +63,11 @@ def main():
     initial_state = sorted_states[0]
     final_states = { sorted_states[-1] }
     
-    jff_root = create_jff(states, transitions, initial_state, final_states)
+    jff_text = create_jff(states, transitions, initial_state, final_states)
     
-    # Write to file with pretty printing.
-    tree = ET.ElementTree(jff_root)
-    tree.write(args.jff_file, encoding="utf-8", xml_declaration=True)
+    # Write the whole document at once.
+    with open(args.jff_file, "w", encoding="utf-8") as jff_file:
+        jff_file.write(jff_text)
     print(f"JFF file created: {args.jff_file}")
 
 if __name__ == "__main__":
@@ -8,15 +8,19 @@ parser.add_argument('input_file', help='Path to the JFF automaton file')
 parser.add_argument('output_file', help='Path for the output JSON file')
 args = parser.parse_args()
 
-# Parse the input JFF file
-tree = ET.parse(args.input_file)
-root = tree.getroot()
-
 initial_states = []
 final_states = []
 
-# Iterate over each state element in the JFF file
-for state in root.iter('state'):
+# Stream the input JFF file: states and transitions are cleared as soon as they are
+# fully parsed, so their contents are not kept for the whole parse (only the empty
+# elements stay attached to the root).
+for event, elem in ET.iterparse(args.input_file, events=('end',)):
+    if elem.tag == 'transition':
+        elem.clear()
+        continue
+    if elem.tag != 'state':
+        continue
+    state = elem
     # Get the state id and convert it to int if possible
     state_id = state.get('id')
     try:
@@ -24,12 +28,18 @@ for state in root.iter('state'):
     except (ValueError, TypeError):
         pass
 
+    initial = state.find('initial')
+    final = state.find('final')
+    label = state.find('label')
+    # The child references stay valid after detaching them from the state.
+    state.clear()
+
     # Check if this state is marked as initial or final
-    if state.find('initial') is not None:
+    if initial is not None:
         initial_states.append(state_id)
-    if state.find('final') is not None:
-        if state.find('label') is not None:
-            final_states.append([state_id, state.find('label').text]) 
+    if final is not None:
+        if label is not None:
+            final_states.append([state_id, label.text]) 
             continue
         final_states.append([state_id])
 
@@ -1,7 +1,26 @@
 import json
 import csv
-from collections import deque
-from typing import Dict, List, Optional, Set, Tuple, Any
+import string
+from collections import defaultdict
+from functools import lru_cache
+from operator import itemgetter
+from pathlib import Path
+from typing import DefaultDict, Dict, List, Optional, Set, Tuple, Any
+
+# orjson parses and serializes in C; it is optional and json is used when it is missing.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Character-class transition labels and the characters they match. They are kept as a
+# single transition in the NFA and only expanded to characters on the resulting DFA.
+CHARACTER_CLASSES: Dict[str, str] = {
+    "[0-9]": string.digits,
+    "[a-z]": string.ascii_lowercase,
+    "[A-Z]": string.ascii_uppercase,
+}
 
 
 def read_zigzin_states_types(file_path: str) -> Dict[int, str]:
@@ -9,8 +28,8 @@ def read_zigzin_states_types(file_path: str) -> Dict[int, str]:
     Reads the ZigZin-NFA-states-types.json file and converts it into an NFA accept structure.
     Returns a dictionary where each key is an accept state and the value is its label.
     """
-    with open(file_path, "r") as f:
-        data = json.load(f)
+    raw = Path(file_path).read_bytes()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
     # data is expected to have "initial" and "final" keys
     finals = data.get("final", [])
     accept = {}
@@ -22,7 +41,8 @@ def read_zigzin_states_types(file_path: str) -> Dict[int, str]:
 class NFA:
     """
     Representation of an NFA.
-    transitions: A dictionary where the key is a tuple (state, symbol) and symbol is either a character or None (for ε-transitions).
+    transitions: A dictionary where the key is a tuple (state, symbol) and symbol is either a character,
+    a character-class label from CHARACTER_CLASSES or None (for ε-transitions).
     start: The start state.
     accept: A mapping from an accept state to its label.
     """
@@ -48,85 +68,286 @@ class DFA:
         return f"DFA(start={self.start}, transitions={self.transitions}, accept={self.accept})"
 
 
-def epsilon_closure(nfa: NFA, states: Set[int]) -> Set[int]:
+def number_nfa_states(nfa: NFA) -> List[int]:
     """
-    Computes the epsilon closure of a set of NFA states.
+    Collects every NFA state (start, accept states and transition endpoints) in sorted order.
+    The position of a state in this list is its dense id, which is also its bit position in
+    the bitsets used by the subset construction.
     """
-    closure = set(states)
-    stack = list(states)
+    states = {nfa.start}
+    states.update(nfa.accept)
+    for (state, _), next_states in nfa.transitions.items():
+        states.add(state)
+        states.update(next_states)
+    return sorted(states)
 
-    while stack:
-        state = stack.pop()
+
+def precompute_epsilon_closures(nfa: NFA, state_ids: Dict[int, int]) -> Dict[int, int]:
+    """
+    Computes the epsilon closures of the NFA as bitsets over dense state ids (see number_nfa_states).
+    Returns a dictionary mapping the dense id of each state touched by an ε-transition to its closure;
+    any other state is its own closure. The computation is memoized (see _epsilon_graph_closures), so
+    repeated conversions of the same NFA, or of NFAs sharing its ε-transitions, reuse it.
+    """
+    eps_edges = []
+    for (state, symbol), next_states in nfa.transitions.items():
         # ε-transitions are represented by None
-        next_states = nfa.transitions.get((state, None), [])
-        for next_state in next_states:
-            if next_state not in closure:
-                closure.add(next_state)
-                stack.append(next_state)
-    return closure
+        if symbol is None:
+            eps_edges.append((state_ids[state], tuple(state_ids[s] for s in next_states)))
 
+    # The ε-edges themselves are the cache key, so editing the NFA's ε-transitions
+    # simply misses the cache instead of requiring it to be cleared.
+    return dict(_epsilon_graph_closures(tuple(sorted(eps_edges))))
 
-def move_nfa(nfa: NFA, states: Set[int], symbol: str) -> Set[int]:
+
+@lru_cache()
+def _epsilon_graph_closures(eps_edges: Tuple[Tuple[int, Tuple[int, ...]], ...]) -> Dict[int, int]:
+    """
+    Computes the epsilon closure bitsets of the states touched by the given ε-edges in a single pass.
+    The ε-only graph is split into strongly connected components (Tarjan), which are
+    emitted in reverse topological order, so each component's closure is its members' bits
+    OR-ed with the already computed closures of its successors, once per component.
+    """
+    eps_succ: Dict[int, Tuple[int, ...]] = dict(eps_edges)
+
+    closures: Dict[int, int] = {}
+    index: Dict[int, int] = {}
+    lowlink: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    scc_stack: List[int] = []
+    stack_position: Dict[int, int] = {}
+
+    for root in eps_succ:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack_position[root] = len(scc_stack)
+        scc_stack.append(root)
+        on_stack.add(root)
+        # Iterative DFS: each frame holds a state and the iterator over its ε-successors.
+        work = [(root, iter(eps_succ.get(root, ())))]
+        while work:
+            state, successors = work[-1]
+            for next_state in successors:
+                if next_state not in index:
+                    index[next_state] = lowlink[next_state] = len(index)
+                    stack_position[next_state] = len(scc_stack)
+                    scc_stack.append(next_state)
+                    on_stack.add(next_state)
+                    work.append((next_state, iter(eps_succ.get(next_state, ()))))
+                    break
+                if next_state in on_stack:
+                    lowlink[state] = min(lowlink[state], index[next_state])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[state])
+                if lowlink[state] != index[state]:
+                    continue
+                # `state` is the root of a component: its members are the top of the stack, from
+                # `state` upwards. Pop them in one slice and merge the successors' closures;
+                # successors inside the component have no closure yet and are covered by the members.
+                members = scc_stack[stack_position[state]:]
+                del scc_stack[stack_position[state]:]
+                on_stack.difference_update(members)
+                closure = 0
+                for member in members:
+                    closure |= 1 << member
+                    for next_state in eps_succ.get(member, ()):
+                        closure |= closures.get(next_state, 0)
+                for member in members:
+                    closures[member] = closure
+    return closures
+
+
+def states_to_bitset(states) -> int:
+    """
+    Packs a set of dense NFA state ids into an integer bitset where bit `s` is set for each id `s`.
+    """
+    bits = 0
+    for state in states:
+        bits |= 1 << state
+    return bits
+
+
+def bitset_members(bits: int) -> List[int]:
+    """
+    Unpacks an integer bitset into the sorted list of dense NFA state ids it contains.
+    """
+    members = []
+    while bits:
+        lowest = bits & -bits
+        members.append(lowest.bit_length() - 1)
+        bits ^= lowest
+    return members
+
+
+def build_closure_delta(delta_by_state: List[Dict[int, Tuple[int, ...]]],
+                        closure_bits: Dict[int, int]) -> List[Dict[int, int]]:
+    """
+    Fuses each move with the epsilon closure of its destinations.
+    Returns a list indexed by dense state id where each entry maps a character class id to the
+    bitset of states reachable by that class followed by any number of ε-transitions.
+    """
+    closure_delta = []
+    for bucket in delta_by_state:
+        fused = {}
+        for class_id, next_states in bucket.items():
+            bits = 0
+            for next_state in next_states:
+                bits |= closure_bits.get(next_state, 1 << next_state)
+            fused[class_id] = bits
+        closure_delta.append(fused)
+    return closure_delta
+
+
+def step(closure_delta: List[Dict[int, int]], states: List[int]) -> Dict[int, int]:
     """
-    Given a set of NFA states and a symbol, returns the set of states reachable by that symbol.
+    Given a set of NFA states, returns for every character class they can move on the bitset of
+    states reachable by that class and the epsilon closure applied afterwards.
+    All classes are computed in one sweep over the states, without building intermediate move sets.
     """
-    result = set()
+    next_bits: Dict[int, int] = {}
     for state in states:
-        next_states = nfa.transitions.get((state, symbol), [])
-        for next_state in next_states:
-            result.add(next_state)
-    return result
+        for class_id, bits in closure_delta[state].items():
+            next_bits[class_id] = next_bits.get(class_id, 0) | bits
+    return next_bits
+
+
+def accept_label(accept: Dict[int, str], hit_bits: int) -> str:
+    """
+    Builds the label of a DFA accept state from the bitset of NFA accept states it contains.
+    `accept` maps dense state ids to their labels.
+    Labels are joined in state order; the generic "id" label is dropped when a more specific one is present.
+    """
+    labels = [accept[s] for s in bitset_members(hit_bits)]
+    if "id" in labels and len(labels) > 1:
+        labels.remove("id")
+    return ", ".join(labels)
+
+
+def compress_alphabet(symbols) -> Tuple[Dict[str, List[int]], List[List[str]]]:
+    """
+    Splits the characters matched by the transition symbols (characters and character-class
+    labels) into equivalence classes: characters matched by exactly the same symbols behave
+    identically in every NFA state, so the subset construction only needs one move per class.
+    Returns a mapping from each symbol to the ids of the classes it covers, and the sorted
+    characters of each class. Classes are numbered in order of their smallest character.
+    """
+    covering: Dict[str, List[str]] = {}
+    for symbol in symbols:
+        for char in CHARACTER_CLASSES.get(symbol, (symbol,)):
+            covering.setdefault(char, []).append(symbol)
+
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for char in sorted(covering):
+        groups.setdefault(tuple(covering[char]), []).append(char)
+    classes = sorted(groups.values())
+
+    symbol_classes: Dict[str, List[int]] = {symbol: [] for symbol in symbols}
+    for class_id, chars in enumerate(classes):
+        for symbol in covering[chars[0]]:
+            symbol_classes[symbol].append(class_id)
+    return symbol_classes, classes
+
+
+def build_delta_by_state(nfa: NFA, symbol_classes: Dict[str, List[int]],
+                         state_ids: Dict[int, int]) -> List[Dict[int, Tuple[int, ...]]]:
+    """
+    Buckets the NFA transitions by source state.
+    Returns a list indexed by dense state id (see number_nfa_states) where each entry maps a character
+    class id (see compress_alphabet) to the tuple of dense destination ids.
+    ε-transitions are left out, since they are covered by the precomputed closures.
+    """
+    buckets: List[Dict[int, List[int]]] = [{} for _ in range(len(state_ids))]
+    for (state, symbol), next_states in nfa.transitions.items():
+        if symbol is not None:
+            next_ids = [state_ids[s] for s in next_states]
+            for class_id in symbol_classes[symbol]:
+                buckets[state_ids[state]].setdefault(class_id, []).extend(next_ids)
+    return [{class_id: tuple(next_states) for class_id, next_states in bucket.items()} for bucket in buckets]
 
 
 def convert_nfa_to_dfa(nfa: NFA, alphabet: Set[str]) -> DFA:
     """
     Converts an NFA to a DFA using the subset construction algorithm.
-    `alphabet` is the set of input symbols (excluding ε).
+    `alphabet` is the set of input symbols (excluding ε); every transition symbol must belong to it.
+    Character-class symbols are expanded on the DFA: its transitions are always keyed by single characters.
     """
     dfa_transitions: Dict[Tuple[int, str], int] = {}
     dfa_accept: Dict[int, str] = {}
 
-    # We use frozenset to represent a set of NFA states in a hashable way.
-    state_mapping: Dict[frozenset, int] = {}
-    dfa_states: List[frozenset] = []
+    # Sets of NFA states are packed into integer bitsets over dense state ids, which are
+    # hashable and unioned word by word. dfa_states keeps the unpacked members of each subset.
+    state_mapping: Dict[int, int] = {}
+    dfa_states: List[List[int]] = []
+
+    # The alphabet is only used for validation; the main loop iterates the classes each subset uses.
+    symbols = set(get_alphabet_from_transitions(nfa.transitions))
+    unknown_symbols = symbols - set(alphabet)
+    if unknown_symbols:
+        raise ValueError(f"Transitions use symbols outside the alphabet: {sorted(unknown_symbols)}")
+
+    # Moves are computed once per character class rather than once per character.
+    symbol_classes, char_classes = compress_alphabet(sorted(symbols))
+
+    # NFA states are renumbered to contiguous ids 0..N-1 in state order, so any state ids
+    # (negative or sparse) work as bit positions and the labels keep their order.
+    state_ids = {state: i for i, state in enumerate(number_nfa_states(nfa))}
+    accept = {state_ids[state]: label for state, label in nfa.accept.items()}
+
+    # Epsilon closures are computed once per NFA state and reused for every move.
+    closure_bits = precompute_epsilon_closures(nfa, state_ids)
+    delta_by_state = build_delta_by_state(nfa, symbol_classes, state_ids)
+    closure_delta = build_closure_delta(delta_by_state, closure_bits)
 
     # Start state (apply epsilon closure)
-    start_set = {nfa.start}
-    start_closure = frozenset(epsilon_closure(nfa, start_set))
-    state_mapping[start_closure] = 0
-    dfa_states.append(start_closure)
-
-    # Precompute the set of NFA accept states for easy lookup.
-    nfa_accept_set = set(nfa.accept.keys())
-    if start_closure & nfa_accept_set:
+    start_id = state_ids[nfa.start]
+    start_bits = closure_bits.get(start_id, 1 << start_id)
+    state_mapping[start_bits] = 0
+    dfa_states.append(bitset_members(start_bits))
+
+    # Precompute the bitset of NFA accept states, so accept membership is a single AND.
+    # Many subsets reach the same accept states, so labels are cached by that intersection.
+    accept_mask = states_to_bitset(accept)
+    label_cache: Dict[int, str] = {}
+    start_hit = start_bits & accept_mask
+    if start_hit:
         # Join all the labels from the intersecting accept states.
-        labels = [nfa.accept[s] for s in start_closure if s in nfa.accept]
+        labels = [accept[s] for s in bitset_members(start_hit)]
         dfa_accept[0] = ", ".join(labels)
 
-    queue = deque([0])
-    while queue:
-        current_index = queue.popleft()
+    # dfa_states is append-only, so walking it with an index is a breadth-first traversal:
+    # appending a new subset enqueues it. Bound methods are hoisted out of the loop.
+    append_state = dfa_states.append
+    mapping_get = state_mapping.get
+    current_index = 0
+    while current_index < len(dfa_states):
         current_state_set = dfa_states[current_index]
-        # For each symbol in the alphabet, compute the set of reachable states.
-        for symbol in alphabet:
-            # Apply move and then epsilon closure.
-            move_set = move_nfa(nfa, set(current_state_set), symbol)
-            if not move_set:
-                continue
-            next_closure = frozenset(epsilon_closure(nfa, move_set))
-            if next_closure in state_mapping:
-                next_index = state_mapping[next_closure]
-            else:
+        # First compute the targets of every class the subset can move on (move and epsilon closure
+        # fused), then register them one by one. Only classes with an outgoing transition show up, so
+        # no target is empty. Sorting keeps the DFA state numbering deterministic.
+        class_moves = step(closure_delta, current_state_set)
+        char_moves = []
+        for class_id, next_bits in sorted(class_moves.items()):
+            next_index = mapping_get(next_bits)
+            if next_index is None:
                 next_index = len(dfa_states)
-                state_mapping[next_closure] = next_index
-                dfa_states.append(next_closure)
-                queue.append(next_index)
-                if next_closure & nfa_accept_set:
-                    labels = [nfa.accept[s] for s in next_closure if s in nfa.accept]
-                    if "id" in labels and len(labels) > 1:
-                        labels.remove("id")
-                    dfa_accept[next_index] = ", ".join(labels)
-            dfa_transitions[(current_index, symbol)] = next_index
+                state_mapping[next_bits] = next_index
+                append_state(bitset_members(next_bits))
+                next_hit = next_bits & accept_mask
+                if next_hit:
+                    label = label_cache.get(next_hit)
+                    if label is None:
+                        label = label_cache[next_hit] = accept_label(accept, next_hit)
+                    dfa_accept[next_index] = label
+            char_moves.extend((char, next_index) for char in char_classes[class_id])
+        # Expand the class moves onto the DFA, in character order.
+        char_moves.sort()
+        for char, next_index in char_moves:
+            dfa_transitions[(current_index, char)] = next_index
+        current_index += 1
 
     return DFA(transitions=dfa_transitions, start=0, accept=dfa_accept)
 
@@ -136,30 +357,30 @@ def read_nfa_transitions_csv(file_path: str) -> Dict[Tuple[int, Optional[str]],
     Reads a CSV file of NFA transitions and returns a dictionary.
     The CSV is expected to have three columns: From, Input, To.
     Lines starting with a comment (e.g., "//") will be skipped.
-    An input symbol of an empty string is interpreted as None.
+    An input symbol of an empty string is interpreted as None, and character-class labels
+    such as "[0-9]" are kept as a single symbol.
     """
-    transitions: Dict[Tuple[int, Optional[str]], List[int]] = {}
+    transitions: DefaultDict[Tuple[int, Optional[str]], List[int]] = defaultdict(list)
 
     with open(file_path, newline="") as csvfile:
-        reader = csv.reader(csvfile)
-        for row in reader:
-            # Skip empty rows or comment lines.
-            if not row or (row[0].strip().startswith("//")):
-                continue
-            if len(row) != 3:
+        for row in csv.reader(csvfile):
+            # Skip empty rows, comment lines and rows without exactly three columns.
+            if len(row) != 3 or row[0].lstrip().startswith("//"):
                 continue
+            frm, input_str, to = row
 
+            input_str = input_str.strip()
+            # Character-class labels are kept whole; any other input is reduced to its first character.
+            symbol = input_str if input_str in CHARACTER_CLASSES else input_str[:1] or None
             try:
-                frm = int(row[0].strip())
-                input_str = row[1].strip()
-                symbol = input_str[0] if input_str else None
-                to = int(row[2].strip())
+                # int() already ignores surrounding whitespace.
+                key = (int(frm), symbol)
+                to_state = int(to)
             except ValueError:
                 continue
 
-            key = (frm, symbol)
-            transitions.setdefault(key, []).append(to)
-    return transitions
+            transitions[key].append(to_state)
+    return dict(transitions)
 
 def write_dfa_to_csv(dfa: DFA, file_path: str) -> None:
     """
@@ -170,16 +391,17 @@ def write_dfa_to_csv(dfa: DFA, file_path: str) -> None:
         writer = csv.writer(csvfile)
         # Write header
         writer.writerow(["From", "Input", "To"])
-        # Write each transition
-        for (from_state, input_symbol), to_state in dfa.transitions.items():
-            writer.writerow([str(from_state), str(input_symbol), str(to_state)])
+        # Write all transitions at once; the writer converts the values to strings.
+        writer.writerows([(from_state, input_symbol, to_state)
+                          for (from_state, input_symbol), to_state in dfa.transitions.items()])
 
 def get_alphabet_from_transitions(transitions: Dict[Tuple[int, Optional[str]], Any]) -> List[str]:
     """
     Given a dictionary of transitions where keys are tuples (state, symbol),
     returns a sorted list of unique input symbols (alphabet), excluding None (ε-transitions).
     """
-    alphabet = {symbol for (_, symbol) in transitions.keys() if symbol is not None}
+    alphabet = set(map(itemgetter(1), transitions.keys()))
+    alphabet.discard(None)
     return sorted(alphabet)
 
 def write_dfa_accept_to_json(dfa_accept: Dict[int, str], file_path: str) -> None:
@@ -193,9 +415,14 @@ def write_dfa_accept_to_json(dfa_accept: Dict[int, str], file_path: str) -> None
     # Convert the dictionary into a list of [state, label] pairs.
     data = [[state, label] for state, label in dfa_accept.items()]
     
-    # Write the data to a JSON file.
-    with open(file_path, "w") as json_file:
-        json.dump(data, json_file)
+    # Serialize in one go and write the buffer once. The json fallback uses the same
+    # compact UTF-8 output as orjson, so the file does not depend on which one is installed.
+    if orjson is not None:
+        payload = orjson.dumps(data)
+    else:
+        payload = json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with open(file_path, "wb") as json_file:
+        json_file.write(payload)
 
 
 # Example usage (you can remove or comment this out when integrating into your project)